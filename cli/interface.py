@@ -2,8 +2,11 @@
 Interfaz de línea de comandos para el sistema de gestión de incidentes
 """
 
+import asyncio
+import io
 import os
-from datetime import datetime, timedelta
+import sys
+import threading
 from typing import Optional
 import logging
 
@@ -12,6 +15,18 @@ from incident.models import Incident
 
 logger = logging.getLogger(__name__)
 
+_PRIORITY_ICON = {"high": "🔴", "medium": "🟡", "low": "🟢"}
+_TYPE_ICON = {"infrastructure": "🏗️", "security": "🔒", "application": "💻"}
+_ACTION_ICON = {
+    'created': '📝',
+    'assigned': '👤',
+    'resolved': '✅',
+    'escalated': '⚡'
+}
+_STATUS_KEYS = tuple((s.title(), f"status_{s}") for s in ("pending", "in_progress", "resolved", "escalated"))
+_PRIORITY_KEYS = tuple((p.title(), f"priority_{p}") for p in ("high", "medium", "low"))
+_TYPE_KEYS = tuple((t.title(), f"type_{t}") for t in ("infrastructure", "security", "application"))
+
 
 class IncidentManagerCLI:
     """Interfaz CLI para gestión de incidentes"""
@@ -19,10 +34,63 @@ class IncidentManagerCLI:
     def __init__(self, dispatcher: IncidentDispatcher):
         self.dispatcher = dispatcher
         self.running = True
+        self._interactive = sys.stdin.isatty()
+        self._stdin = sys.stdin if self._interactive else self._buffered_stdin()
+        self._cache = {}
+        self._cache_version = -1
+        self._lock: Optional[asyncio.Lock] = None
+        self._escalated_count = 0
+        self._ansi = self._enable_ansi()
+
+    @staticmethod
+    def _buffered_stdin():
+        """Envolver stdin con un buffer de 16 KiB cuando no es una terminal"""
+        buffer = getattr(sys.stdin, 'buffer', None)
+        if buffer is None:
+            return sys.stdin
+        return io.TextIOWrapper(
+            io.BufferedReader(buffer.raw, buffer_size=16384),
+            encoding='utf-8', newline='\n', line_buffering=False
+        )
+
+    def _read_line(self, prompt: str) -> str:
+        """Leer una línea de entrada (input() solo en modo interactivo)"""
+        if self._interactive:
+            return input(prompt)
+
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        line = self._stdin.readline()
+        if not line:
+            raise EOFError
+        return line.rstrip('\n')
+
+    @staticmethod
+    def _enable_ansi() -> bool:
+        """Verificar soporte de secuencias ANSI (activando modo VT en Windows)"""
+        if os.environ.get('TERM') == 'dumb':
+            return False
+        if os.name != 'nt':
+            return True
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+            mode = ctypes.c_uint32()
+            if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+                return False
+            # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+            return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+        except Exception:
+            return False
 
     def clear_screen(self):
         """Limpiar pantalla"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        if self._ansi:
+            sys.stdout.write("\x1b[2J\x1b[H")
+            sys.stdout.flush()
+        else:
+            os.system('cls' if os.name == 'nt' else 'clear')
 
     def show_header(self):
         """Mostrar encabezado del sistema"""
@@ -47,16 +115,28 @@ class IncidentManagerCLI:
         print("9. 📈 Ver estadísticas")
         print("0. 🚪 Salir")
         print("-" * 30)
+        print("Ctrl+C guarda los datos y cierra el sistema")
+
+    def _operators(self) -> tuple[dict, list]:
+        """Obtener operadores y disponibles, cacheados por versión del despachador"""
+        if self._cache_version != self.dispatcher.version:
+            operators = self.dispatcher.get_operators()
+            self._cache = {
+                'operators': operators,
+                'available': [name for name, op in operators.items() if op.available]
+            }
+            self._cache_version = self.dispatcher.version
+        return self._cache['operators'], self._cache['available']
 
     def get_input(self, prompt: str, required: bool = True) -> Optional[str]:
         """Obtener entrada del usuario con validación"""
         while True:
             try:
-                value = input(f"{prompt}: ").strip()
+                value = self._read_line(f"{prompt}: ").strip()
                 if value or not required:
                     return value if value else None
                 print("❌ Este campo es obligatorio")
-            except (EOFError, KeyboardInterrupt):
+            except EOFError:
                 return None
 
     def get_choice(self, prompt: str, valid_choices: list) -> Optional[str]:
@@ -67,7 +147,7 @@ class IncidentManagerCLI:
 
         while True:
             try:
-                choice_input = input("Seleccione opción (número): ").strip()
+                choice_input = self._read_line("Seleccione opción (número): ").strip()
                 if not choice_input:
                     return None
 
@@ -79,7 +159,7 @@ class IncidentManagerCLI:
 
             except ValueError:
                 print("❌ Ingrese un número válido")
-            except (EOFError, KeyboardInterrupt):
+            except EOFError:
                 return None
 
     def register_incident(self):
@@ -138,22 +218,25 @@ class IncidentManagerCLI:
         print(f"Total de incidentes pendientes: {len(pending)}")
         print()
 
-        for incident in pending:
-            self._display_incident_summary(incident)
+        self._display_incidents(pending)
 
-    def _display_incident_summary(self, incident: Incident):
-        """Mostrar resumen de un incidente"""
-        priority_icon = {"high": "🔴", "medium": "🟡", "low": "🟢"}
-        type_icon = {"infrastructure": "🏗️", "security": "🔒", "application": "💻"}
-
-        print(f"[{incident.id:03d}] {type_icon.get(incident.type, '📄')} {incident.type.title()}")
-        print(f"      {priority_icon.get(incident.priority)} Prioridad: {incident.priority}")
-        print(f"      📝 {incident.description[:60]}{'...' if len(incident.description) > 60 else ''}")
-        print(f"      🕐 Creado: {incident.created_at.strftime('%d/%m/%Y %H:%M')}")
+    def _display_incident_summary(self, incident: Incident, parts: list):
+        """Agregar a `parts` el resumen de un incidente"""
+        parts.append(f"[{incident.id:03d}] {_TYPE_ICON.get(incident.type, '📄')} {incident.type.title()}\n")
+        parts.append(f"      {_PRIORITY_ICON.get(incident.priority)} Prioridad: {incident.priority}\n")
+        parts.append(f"      📝 {incident.desc_short_60}\n")
+        parts.append(f"      🕐 Creado: {incident.created_at.strftime('%d/%m/%Y %H:%M')}\n")
         if incident.assigned_to:
-            print(f"      👤 Asignado a: {incident.assigned_to}")
-        print(f"      📊 Estado: {incident.status}")
-        print()
+            parts.append(f"      👤 Asignado a: {incident.assigned_to}\n")
+        parts.append(f"      📊 Estado: {incident.status}\n\n")
+
+    def _display_incidents(self, incidents):
+        """Mostrar resúmenes de incidentes con una sola escritura a stdout"""
+        parts = []
+        for incident in incidents:
+            self._display_incident_summary(incident, parts)
+        sys.stdout.write("".join(parts))
+        sys.stdout.flush()
 
     def assign_incident(self):
         """Asignar incidente a operador"""
@@ -168,7 +251,7 @@ class IncidentManagerCLI:
 
         print("Incidentes disponibles:")
         for incident in pending[:10]:  # Mostrar solo los primeros 10
-            print(f"  [{incident.id:03d}] {incident.type} - {incident.priority} - {incident.description[:40]}...")
+            print(f"  [{incident.id:03d}] {incident.type} - {incident.priority} - {incident.desc_short_40}")
 
         # Obtener ID del incidente
         incident_id_str = self.get_input("ID del incidente a asignar")
@@ -183,8 +266,7 @@ class IncidentManagerCLI:
             return
 
         # Mostrar operadores disponibles
-        operators = self.dispatcher.get_operators()
-        available_operators = [name for name, op in operators.items() if op.available]
+        operators, available_operators = self._operators()
 
         if not available_operators:
             print("❌ No hay operadores disponibles")
@@ -193,7 +275,7 @@ class IncidentManagerCLI:
         print("\nOperadores disponibles:")
         for name in available_operators:
             operator = operators[name]
-            print(f"  • {name} - Roles: {', '.join(operator.roles)}")
+            print(f"  • {name} - Roles: {', '.join(sorted(operator.roles))}")
 
         # Obtener operador
         operator_name = self.get_input("Nombre del operador")
@@ -266,23 +348,15 @@ class IncidentManagerCLI:
         print("\n📊 HISTORIAL DE OPERACIONES")
         print("-" * 35)
 
-        history = self.dispatcher.get_history(20)  # Últimas 20 operaciones
+        history = self.dispatcher.get_history_recent(20)  # Últimas 20, más recientes primero
 
         if not history:
             print("📋 No hay operaciones en el historial")
             return
 
-        for entry in reversed(history):  # Mostrar más recientes primero
-            timestamp = datetime.fromisoformat(entry['timestamp'])
-            action_icons = {
-                'created': '📝',
-                'assigned': '👤',
-                'resolved': '✅',
-                'escalated': '⚡'
-            }
-
-            icon = action_icons.get(entry['action'], '📄')
-            print(f"{icon} {timestamp.strftime('%d/%m %H:%M')} - "
+        for entry in history:
+            icon = _ACTION_ICON.get(entry['action'], '📄')
+            print(f"{icon} {entry['ts_short']} - "
                   f"ID:{entry['incident_id']:03d} - {entry['details']}")
 
     def search_incidents(self):
@@ -316,8 +390,7 @@ class IncidentManagerCLI:
         print("-" * 40)
 
         if results:
-            for incident in results[:20]:  # Mostrar máximo 20
-                self._display_incident_summary(incident)
+            self._display_incidents(results[:20])  # Mostrar máximo 20
         else:
             print("No se encontraron incidentes con los criterios especificados")
 
@@ -347,7 +420,7 @@ class IncidentManagerCLI:
 
     def _show_operators(self):
         """Mostrar lista de operadores"""
-        operators = self.dispatcher.get_operators()
+        operators, _ = self._operators()
 
         print("\n👥 OPERADORES REGISTRADOS")
         print("-" * 30)
@@ -355,7 +428,7 @@ class IncidentManagerCLI:
         for name, operator in operators.items():
             status_icon = "🟢" if operator.available else "🔴"
             print(f"{status_icon} {name}")
-            print(f"     Roles: {', '.join(operator.roles)}")
+            print(f"     Roles: {', '.join(sorted(operator.roles))}")
             print()
 
     def _add_operator(self):
@@ -381,8 +454,15 @@ class IncidentManagerCLI:
             return
 
         try:
-            role_indices = [int(x.strip()) - 1 for x in roles_input.split(",")]
-            selected_roles = tuple(available_roles[i] for i in role_indices if 0 <= i < len(available_roles))
+            # Una sola pasada: convierte, valida rango y descarta duplicados
+            seen = set()
+            selected = []
+            for x in roles_input.split(","):
+                i = int(x.strip()) - 1
+                if 0 <= i < len(available_roles) and i not in seen:
+                    seen.add(i)
+                    selected.append(available_roles[i])
+            selected_roles = tuple(selected)
 
             if not selected_roles:
                 print("❌ No se seleccionaron roles válidos")
@@ -412,77 +492,124 @@ class IncidentManagerCLI:
         print()
 
         print("📋 Por Estado:")
-        statuses = ["pending", "in_progress", "resolved", "escalated"]
-        for status in statuses:
-            count = stats.get(f"status_{status}", 0)
+        for label, key in _STATUS_KEYS:
+            count = stats.get(key, 0)
             if count > 0:
-                print(f"   {status.title()}: {count}")
+                print(f"   {label}: {count}")
         print()
 
         print("🎯 Por Prioridad:")
-        priorities = ["high", "medium", "low"]
-        for priority in priorities:
-            count = stats.get(f"priority_{priority}", 0)
+        for label, key in _PRIORITY_KEYS:
+            count = stats.get(key, 0)
             if count > 0:
-                print(f"   {priority.title()}: {count}")
+                print(f"   {label}: {count}")
         print()
 
         print("🏷️ Por Tipo:")
-        types = ["infrastructure", "security", "application"]
-        for incident_type in types:
-            count = stats.get(f"type_{incident_type}", 0)
+        for label, key in _TYPE_KEYS:
+            count = stats.get(key, 0)
             if count > 0:
-                print(f"   {incident_type.title()}: {count}")
+                print(f"   {label}: {count}")
 
-    def run(self):
+    def shutdown(self):
+        """Guardar datos y detener la interfaz"""
+        print("\n👋 Guardando datos y cerrando sistema...")
+        self.dispatcher.shutdown()
+        self.running = False
+
+    async def _in_thread(self, func, *args):
+        """Ejecutar una función bloqueante en un hilo daemon sin detener el event loop"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def settle(result, error):
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        def target():
+            try:
+                result, error = func(*args), None
+            except Exception as e:
+                result, error = None, e
+            try:
+                loop.call_soon_threadsafe(settle, result, error)
+            except RuntimeError:
+                pass  # El event loop ya se cerró
+
+        # Hilo daemon: un input() pendiente no impide cerrar el proceso con Ctrl+C
+        threading.Thread(target=target, daemon=True).start()
+        return await future
+
+    async def _prompt(self, msg: str) -> str:
+        """Leer una línea sin bloquear el event loop"""
+        return await self._in_thread(self._read_line, msg)
+
+    async def _escalation_loop(self, interval: float = 30):
+        """Escalar incidentes automáticamente cada `interval` segundos"""
+        while self.running:
+            async with self._lock:
+                # Sin mensajes en consola mientras el usuario escribe; se informa vía _escalated_count
+                self._escalated_count += self.dispatcher.auto_escalate_incidents(quiet=True)
+            await asyncio.sleep(interval)
+
+    async def run(self):
         """Ejecutar la interfaz CLI"""
+        self._lock = asyncio.Lock()
+        escalation_task = asyncio.create_task(self._escalation_loop())
+
+        actions = {
+            "1": self.register_incident,
+            "2": self.show_pending_incidents,
+            "3": self.assign_incident,
+            "4": self.resolve_incident,
+            "5": self.auto_escalate,
+            "6": self.show_history,
+            "7": self.search_incidents,
+            "8": self.manage_operators,
+            "9": self.show_statistics,
+            "0": self.shutdown,
+        }
+
         try:
             while self.running:
                 self.clear_screen()
                 self.show_header()
 
-                # Escalamiento automático en cada ciclo
-                escalated = self.dispatcher.auto_escalate_incidents()
+                # Escalamientos realizados en segundo plano desde el último ciclo
+                escalated, self._escalated_count = self._escalated_count, 0
                 if escalated > 0:
                     print(f"⚡ {escalated} incidentes escalados automáticamente\n")
 
                 self.show_menu()
 
-                choice = self.get_input("Seleccione una opción")
+                choice = await self._in_thread(self.get_input, "Seleccione una opción")
                 if not choice:
                     continue
 
-                if choice == "1":
-                    self.register_incident()
-                elif choice == "2":
-                    self.show_pending_incidents()
-                elif choice == "3":
-                    self.assign_incident()
-                elif choice == "4":
-                    self.resolve_incident()
-                elif choice == "5":
-                    self.auto_escalate()
-                elif choice == "6":
-                    self.show_history()
-                elif choice == "7":
-                    self.search_incidents()
-                elif choice == "8":
-                    self.manage_operators()
-                elif choice == "9":
-                    self.show_statistics()
-                elif choice == "0":
-                    print("\n👋 Guardando datos y cerrando sistema...")
-                    with self.dispatcher.incident_session():
-                        pass  # Fuerza el guardado
-                    self.running = False
-                else:
+                action = actions.get(choice)
+                if action is None:
                     print("❌ Opción inválida")
+                else:
+                    async with self._lock:
+                        await self._in_thread(action)
 
                 if self.running:
-                    input("\nPresione Enter para continuar...")
+                    await self._prompt("\nPresione Enter para continuar...")
 
-        except KeyboardInterrupt:
-            print("\n\n👋 Sistema cerrado por el usuario")
+        except asyncio.CancelledError:
+            # Los prompts corren en hilos: Ctrl+C cancela esta tarea y asyncio.run
+            # lo propaga como KeyboardInterrupt hacia main
+            raise
         except Exception as e:
             print(f"\n❌ Error en la interfaz: {e}")
             logger.error(f"Error en CLI: {e}", exc_info=True)
+        finally:
+            escalation_task.cancel()
+            if self.running:
+                # Cierre sin la opción 0: persistir y compactar el journal igualmente
+                self.running = False
+                self.dispatcher.shutdown()
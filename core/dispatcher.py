@@ -2,21 +2,45 @@
 Despachador central del sistema de gestión de incidentes
 """
 
-from collections import deque, defaultdict
-from datetime import datetime
-from typing import Optional, Dict, Set, List, Iterator
+from collections import deque, defaultdict, Counter
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Set, FrozenSet, List, Iterable, Iterator, Mapping, NamedTuple
 from contextlib import contextmanager
+from dataclasses import replace
+from itertools import islice
 import logging
+import time
 
 from incident.models import Incident, Operator
 from incident.filters import IncidentFilter
+from incident import search_fast
 from core.escalator import IncidentEscalator, CompositeEscalation, TimeBasedEscalation, PriorityBasedEscalation
-from core.validator import IncidentValidator, log_operation, validate_input
-from rules.default_rules import get_default_rules, get_default_operators
+from core.validator import IncidentValidator, log_operation, validated_operation
+from rules.default_rules import get_default_rules, get_default_operators, get_role_index, invert_rules
 from persistence.storage import StorageManager
 
 logger = logging.getLogger(__name__)
 
+# Máximo de operaciones que se conservan en memoria
+HISTORY_MAXLEN = 10_000
+
+
+class HistoryEntry(NamedTuple):
+    """Operación registrada en el historial (se convierte a dict al consultarla)"""
+    ts: float  # Segundos desde epoch; se formatea solo al consultar
+    action: str
+    incident_id: int
+    details: str
+    operator: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        """Convertir a diccionario con marcas de tiempo formateadas"""
+        moment = datetime.fromtimestamp(self.ts)
+        data = self._asdict()
+        data['timestamp'] = moment.isoformat()
+        data['ts_short'] = moment.strftime('%d/%m %H:%M')
+        return data
+
 
 class IncidentDispatcher:
     """Despachador central para gestión de incidentes"""
@@ -24,11 +48,25 @@ class IncidentDispatcher:
     def __init__(self, storage_manager: StorageManager):
         self.storage = storage_manager
         self.incidents: Dict[int, Incident] = {}
-        self.pending_queue = deque()  # Cola por prioridad
+        # Una cola FIFO de ids por prioridad; _pending_ids marca los que siguen pendientes
+        self._queues: Dict[str, deque] = {"high": deque(), "medium": deque(), "low": deque()}
+        self._pending_ids: Set[int] = set()
+        self._stale: Dict[str, int] = {"high": 0, "medium": 0, "low": 0}  # ids retirados aún en cada deque
         self.operators: Dict[str, Operator] = {}
-        self.type_to_roles: Dict[str, Set[str]] = defaultdict(set)
-        self.history: List[Dict] = []
+        self.type_to_roles: Dict[str, FrozenSet[str]] = {}
+        self._role_to_types: Mapping[str, FrozenSet[str]] = {}  # Reglas invertidas: rol -> tipos
+        self._op_by_type: Dict[str, Set[str]] = defaultdict(set)  # Tipo -> operadores disponibles
+        self.history: deque[HistoryEntry] = deque(maxlen=HISTORY_MAXLEN)
         self.next_id = 1
+        self.version = 0  # Contador de mutaciones para invalidar cachés
+        self._search_arrays: Optional[search_fast.IncidentArrays] = None  # Se crea en la primera búsqueda rápida
+        self._dirty_ids: Set[int] = set()  # Incidentes modificados sin persistir
+        self._session_depth = 0
+
+        # Índices invertidos: valor -> ids de incidentes
+        self._by_status: Dict[str, Set[int]] = defaultdict(set)
+        self._by_type: Dict[str, Set[int]] = defaultdict(set)
+        self._by_operator: Dict[str, Set[int]] = defaultdict(set)
 
         # Componentes
         self.escalator = IncidentEscalator(
@@ -55,6 +93,7 @@ class IncidentDispatcher:
                 for operator in get_default_operators():
                     self.operators[operator.name] = operator
 
+            self._rebuild_routing()
             logger.info(f"Sistema inicializado con {len(self.operators)} operadores")
 
         except Exception as e:
@@ -63,59 +102,174 @@ class IncidentDispatcher:
             self.type_to_roles.update(get_default_rules())
             for operator in get_default_operators():
                 self.operators[operator.name] = operator
+            self._rebuild_routing()
 
     def _load_persisted_data(self):
         """Cargar datos desde almacenamiento"""
         try:
-            data = self.storage.load_incidents()
-            for incident_data in data:
-                incident = Incident.from_dict(incident_data)
+            for incident_data in self.storage.iter_incidents():
+                # El id reservado cuenta aunque el registro no se pueda cargar,
+                # así un incidente nuevo nunca reutiliza el id de uno persistido
+                persisted_id = incident_data.get('id')
+                if isinstance(persisted_id, int):
+                    self.next_id = max(self.next_id, persisted_id + 1)
+                try:
+                    incident = Incident.from_dict(incident_data)
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.warning(f"Incidente persistido {persisted_id} ignorado: {e}")
+                    continue
                 self.incidents[incident.id] = incident
+                self._index(incident)
                 if incident.status == "pending":
                     self._add_to_queue(incident)
-                self.next_id = max(self.next_id, incident.id + 1)
 
             logger.info(f"Cargados {len(self.incidents)} incidentes desde almacenamiento")
         except Exception as e:
             logger.warning(f"No se pudieron cargar datos persistidos: {e}")
 
+    def _route_operator(self, operator: Operator):
+        """Actualizar la tabla de enrutamiento para un operador según reglas y disponibilidad"""
+        handled = set()
+        if operator.available:
+            for role in operator.roles:
+                handled |= self._role_to_types.get(role, frozenset())
+        for incident_type in self.type_to_roles:
+            if incident_type in handled:
+                self._op_by_type[incident_type].add(operator.name)
+            else:
+                self._op_by_type[incident_type].discard(operator.name)
+
+    def _rebuild_routing(self):
+        """Reconstruir la tabla tipo -> operadores disponibles"""
+        # Con las reglas por defecto se usa el índice precalculado al importar
+        if self.type_to_roles == get_default_rules():
+            self._role_to_types = get_role_index()
+        else:
+            self._role_to_types = invert_rules(self.type_to_roles)
+        self._op_by_type.clear()
+        for operator in self.operators.values():
+            self._route_operator(operator)
+
+    def _index(self, incident: Incident):
+        """Agregar incidente a los índices invertidos"""
+        self._by_status[incident.status].add(incident.id)
+        self._by_type[incident.type].add(incident.id)
+        if incident.assigned_to:
+            self._by_operator[incident.assigned_to].add(incident.id)
+
+    def _unindex(self, incident: Incident):
+        """Quitar incidente de los índices invertidos"""
+        self._by_status[incident.status].discard(incident.id)
+        self._by_type[incident.type].discard(incident.id)
+        if incident.assigned_to:
+            self._by_operator[incident.assigned_to].discard(incident.id)
+
+    def _store(self, incident: Incident):
+        """Guardar versión nueva de un incidente manteniendo índices y estado de cambios"""
+        previous = self.incidents.get(incident.id)
+        if previous is not None:
+            self._unindex(previous)
+        self.incidents[incident.id] = incident
+        self._index(incident)
+        if self._search_arrays is not None:
+            self._search_arrays.upsert(incident)
+        self.version += 1
+        if self._session_depth:
+            self._dirty_ids.add(incident.id)
+        else:
+            # Fuera de una sesión el cambio se persiste al momento con un append O(1)
+            self._persist_now(incident)
+
+    def _persist_now(self, incident: Incident):
+        """Agregar un incidente al journal; si falla queda pendiente para el próximo guardado"""
+        try:
+            self.storage.append_incident(incident.to_dict())
+        except Exception as e:
+            logger.error(f"Error guardando incidente {incident.id}: {e}")
+            self._dirty_ids.add(incident.id)
+
     def _add_to_queue(self, incident: Incident):
         """Agregar incidente a la cola según prioridad"""
-        if incident.priority == "high":
-            self.pending_queue.appendleft(incident)  # Alta prioridad al inicio
-        else:
-            self.pending_queue.append(incident)
+        self._queues[incident.priority].append(incident.id)
+        self._pending_ids.add(incident.id)
+
+    def _remove_from_queue(self, incident_id: int):
+        """Retirar incidente de la cola en O(1) amortizado; la deque se depura de forma diferida"""
+        if incident_id not in self._pending_ids:
+            return
+        self._pending_ids.discard(incident_id)
+        priority = self.incidents[incident_id].priority
+        self._stale[priority] += 1
+        # Depurar cuando los ids retirados superan la mitad de la deque
+        if 2 * self._stale[priority] > len(self._queues[priority]):
+            self._sweep_queue(priority)
+
+    def _sweep_queue(self, priority: str) -> deque:
+        """Descartar de la deque los ids ya retirados"""
+        if self._stale[priority]:
+            self._queues[priority] = deque(i for i in self._queues[priority] if i in self._pending_ids)
+            self._stale[priority] = 0
+        return self._queues[priority]
+
+    def _add_history(self, action: str, incident_id: int, details: str,
+                     operator: Optional[str] = None):
+        """Registrar operación en historial"""
+        self.history.append(HistoryEntry(time.time(), action, incident_id, details, operator))
+
+    @contextmanager
+    def _deferred_writes(self, log_level: int = logging.INFO):
+        """Agrupar los cambios y persistirlos en una sola escritura al salir"""
+        self._session_depth += 1
+        try:
+            yield
+        finally:
+            self._session_depth -= 1
+            # Solo el nivel más externo persiste los cambios
+            if self._session_depth == 0:
+                self._save_data(log_level)
 
     @contextmanager
     def incident_session(self):
         """Contexto para operaciones con incidentes"""
         logger.info("Iniciando sesión de incidentes")
         try:
-            yield self
+            with self._deferred_writes():
+                yield self
         except Exception as e:
             logger.error(f"Error en sesión de incidentes: {e}")
             raise
         finally:
-            self._save_data()
             logger.info("Sesión de incidentes finalizada")
 
-    def _save_data(self):
+    def shutdown(self):
+        """Persistir cambios pendientes, compactar y detener el almacenamiento"""
+        self._save_data()
+        try:
+            self.storage.compact()
+        except Exception as e:
+            logger.error(f"Error compactando almacenamiento: {e}")
+        self.storage.close()
+
+    def _save_data(self, log_level: int = logging.INFO):
         """Guardar datos al almacenamiento"""
+        if not self._dirty_ids:
+            return
         try:
-            incidents_data = [incident.to_dict() for incident in self.incidents.values()]
-            self.storage.save_incidents(incidents_data)
+            dirty_records = [self.incidents[i].to_dict() for i in self._dirty_ids]
+            self.storage.append_events(dirty_records, log_level)
+            self._dirty_ids.clear()
             #logger.info("Datos guardados exitosamente")
         except Exception as e:
             logger.error(f"Error guardando datos: {e}")
 
-    @log_operation("registro_incidente")
-    @validate_input(lambda x: isinstance(x, str) and x.strip(), "Tipo de incidente inválido")
+    @validated_operation("registro_incidente",
+                         lambda x: isinstance(x, str) and x.strip(), "Tipo de incidente inválido")
     def register_incident(self, incident_type: str, priority: str, description: str) -> Optional[int]:
         """Registrar un nuevo incidente"""
         try:
-            # Validar datos
-            errors = IncidentValidator.validate_all_incident_data(incident_type, priority, description)
-            if errors:
+            # Validar datos (los mensajes solo se construyen si la validación falla)
+            if not IncidentValidator.validate_all_incident_data_fast(incident_type, priority, description):
+                errors = IncidentValidator.validate_all_incident_data(incident_type, priority, description)
                 logger.error(f"Errores de validación: {'; '.join(errors)}")
                 raise ValueError(f"Datos inválidos: {'; '.join(errors)}")
 
@@ -131,17 +285,12 @@ class IncidentDispatcher:
             )
 
             # Almacenar
-            self.incidents[incident.id] = incident
+            self._store(incident)
             self._add_to_queue(incident)
             self.next_id += 1
 
             # Registrar en historial
-            self.history.append({
-                'timestamp': datetime.now().isoformat(),
-                'action': 'created',
-                'incident_id': incident.id,
-                'details': f"Creado: {incident_type} - {priority}"
-            })
+            self._add_history('created', incident.id, f"Creado: {incident_type} - {priority}")
 
             #logger.info(f"Incidente {incident.id} registrado exitosamente")
             return incident.id
@@ -152,13 +301,14 @@ class IncidentDispatcher:
 
     def get_pending_incidents(self) -> List[Incident]:
         """Obtener lista de incidentes pendientes por prioridad"""
-        return list(self.pending_queue)
+        pending = []
+        for priority in self._queues:
+            pending.extend(self.incidents[i] for i in self._sweep_queue(priority))
+        return pending
 
     def get_incidents_by_status(self, status: str) -> Iterator[Incident]:
         """Obtener incidentes por estado usando generador"""
-        for incident in self.incidents.values():
-            if incident.status == status:
-                yield incident
+        return (self.incidents[i] for i in sorted(self._by_status.get(status, ())))
 
     @log_operation("asignacion_incidente")
     def assign_incident(self, incident_id: int, operator_name: str) -> bool:
@@ -176,36 +326,28 @@ class IncidentDispatcher:
                 logger.warning(f"Incidente {incident_id} no está pendiente")
                 return False
 
-            # Validar operador existe y está disponible
+            # Validar operador existe
             if operator_name not in self.operators:
                 logger.warning(f"Operador {operator_name} no encontrado")
                 return False
 
-            operator = self.operators[operator_name]
-            if not operator.available:
-                logger.warning(f"Operador {operator_name} no disponible")
-                return False
-
-            # Validar permisos
-            if not operator.can_handle(incident.type):
-                logger.warning(f"Operador {operator_name} no puede manejar tipo {incident.type}")
+            # Validar disponibilidad y permisos con la tabla de enrutamiento
+            if operator_name not in self._op_by_type.get(incident.type, ()):
+                if not self.operators[operator_name].available:
+                    logger.warning(f"Operador {operator_name} no disponible")
+                else:
+                    logger.warning(f"Operador {operator_name} no puede manejar tipo {incident.type}")
                 return False
 
             # Realizar asignación
-            updated_incident = incident.with_assignment(operator_name)
-            self.incidents[incident_id] = updated_incident
+            self._store(incident.with_assignment(operator_name))
 
             # Remover de cola pendientes
-            self.pending_queue = deque(inc for inc in self.pending_queue if inc.id != incident_id)
+            self._remove_from_queue(incident_id)
 
             # Registrar en historial
-            self.history.append({
-                'timestamp': datetime.now().isoformat(),
-                'action': 'assigned',
-                'incident_id': incident_id,
-                'operator': operator_name,
-                'details': f"Asignado a {operator_name}"
-            })
+            self._add_history('assigned', incident_id, f"Asignado a {operator_name}",
+                              operator=operator_name)
 
             logger.info(f"Incidente {incident_id} asignado a {operator_name}")
             return True
@@ -229,20 +371,14 @@ class IncidentDispatcher:
                 return False
 
             # Actualizar estado
-            resolved_incident = incident.with_status("resolved")
-            self.incidents[incident_id] = resolved_incident
+            self._store(incident.with_status("resolved"))
 
             # Remover de cola si estaba pendiente
-            self.pending_queue = deque(inc for inc in self.pending_queue if inc.id != incident_id)
+            self._remove_from_queue(incident_id)
 
             # Registrar en historial
-            self.history.append({
-                'timestamp': datetime.now().isoformat(),
-                'action': 'resolved',
-                'incident_id': incident_id,
-                'operator': incident.assigned_to,
-                'details': f"Resuelto por {incident.assigned_to or 'sistema'}"
-            })
+            self._add_history('resolved', incident_id, f"Resuelto por {incident.assigned_to or 'sistema'}",
+                              operator=incident.assigned_to)
 
             logger.info(f"Incidente {incident_id} resuelto")
             return True
@@ -251,33 +387,35 @@ class IncidentDispatcher:
             logger.error(f"Error resolviendo incidente {incident_id}: {e}")
             return False
 
-    def auto_escalate_incidents(self) -> int:
-        """Escalar automáticamente incidentes según reglas"""
+    def auto_escalate_incidents(self, quiet: bool = False) -> int:
+        """Escalar automáticamente incidentes según reglas
+
+        Con `quiet` los mensajes informativos bajan a DEBUG (barridos en segundo plano).
+        """
+        info_level = logging.DEBUG if quiet else logging.INFO
+        warning_level = logging.DEBUG if quiet else logging.WARNING
         escalated_count = 0
         try:
-            # Encontrar incidentes para escalar
-            pending_incidents = list(self.get_incidents_by_status("pending")) + \
-                                list(self.get_incidents_by_status("in_progress"))
+            # Encontrar incidentes para escalar: una sola pasada sobre pendientes y en progreso.
+            # La unión crea un conjunto nuevo, así _store puede modificar los índices durante el recorrido
+            candidate_ids = self._by_status.get("pending", set()) | self._by_status.get("in_progress", set())
+            candidates = (self.incidents[i] for i in candidate_ids)
 
-            for incident in self.escalator.find_escalatable_incidents(pending_incidents):
-                escalated_incident = self.escalator.escalate_incident(incident)
-                self.incidents[incident.id] = escalated_incident
+            # Un barrido completo se persiste en una sola escritura
+            with self._deferred_writes(info_level):
+                for incident in self.escalator.find_escalatable_incidents(candidates, info_level):
+                    self._store(self.escalator.escalate_incident(incident, warning_level))
 
-                # Remover de cola pendientes
-                self.pending_queue = deque(inc for inc in self.pending_queue if inc.id != incident.id)
+                    # Remover de cola pendientes
+                    self._remove_from_queue(incident.id)
 
-                # Registrar en historial
-                self.history.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'action': 'escalated',
-                    'incident_id': incident.id,
-                    'details': 'Escalado automáticamente por tiempo'
-                })
+                    # Registrar en historial
+                    self._add_history('escalated', incident.id, 'Escalado automáticamente por tiempo')
 
-                escalated_count += 1
+                    escalated_count += 1
 
             if escalated_count > 0:
-                logger.info(f"Escalados {escalated_count} incidentes automáticamente")
+                logger.log(info_level, f"Escalados {escalated_count} incidentes automáticamente")
 
             return escalated_count
 
@@ -290,49 +428,101 @@ class IncidentDispatcher:
                          days_back: int = 30) -> List[Incident]:
         """Buscar incidentes con múltiples criterios"""
         try:
-            incidents = self.incidents.values()
+            # Fecha de corte calculada una sola vez por búsqueda
+            start_date = datetime.now() - timedelta(days=days_back) if days_back > 0 else None
+
+            # Filtros de más a menos selectivos: índices, fecha y al final el texto
+            candidate_ids = self._candidate_ids(incident_type, operator, status)
+            if candidate_ids is not None:
+                # Filtros de igualdad resueltos con los índices invertidos
+                incidents = (self.incidents[i] for i in sorted(candidate_ids))
+            elif start_date and search_fast.JIT_ENABLED and len(self.incidents) >= search_fast.MIN_INCIDENTS:
+                return self._search_fast(text, start_date)
+            else:
+                incidents = self.incidents.values()
+
+            if start_date:
+                incidents = IncidentFilter.by_date_range(incidents, start_date=start_date)
 
-            # Aplicar filtros
             if text:
                 incidents = IncidentFilter.by_text(incidents, text)
 
-            if incident_type:
-                incidents = IncidentFilter.by_type(incidents, incident_type)
-
-            if operator:
-                incidents = IncidentFilter.by_operator(incidents, operator)
-
-            if status:
-                incidents = IncidentFilter.by_status(incidents, status)
-
-            if days_back > 0:
-                start_date = datetime.now() - timedelta(days=days_back)
-                incidents = IncidentFilter.by_date_range(incidents, start_date=start_date)
-
             return list(incidents)
 
         except Exception as e:
             logger.error(f"Error en búsqueda: {e}")
             return []
 
+    def _candidate_ids(self, incident_type: str, operator: str, status: str) -> Optional[Set[int]]:
+        """Intersectar índices de los filtros de igualdad (None si no hay ninguno)"""
+        id_sets = []
+        if status:
+            id_sets.append(self._by_status.get(status, set()))
+        if incident_type:
+            id_sets.append(self._by_type.get(incident_type, set()))
+        if operator:
+            id_sets.append(self._by_operator.get(operator, set()))
+
+        if not id_sets:
+            return None
+
+        # Empezar por el índice más selectivo
+        id_sets.sort(key=len)
+        return id_sets[0].intersection(*id_sets[1:])
+
+    def _search_fast(self, text: str, start_date: datetime) -> List[Incident]:
+        """Filtrar por fecha con el filtro compilado (sin filtros de igualdad)"""
+        if self._search_arrays is None:
+            # Se construye una vez; _store lo mantiene al día
+            self._search_arrays = search_fast.IncidentArrays(self.incidents.values())
+
+        incidents = self._search_arrays.filter(start_date)
+        if text:
+            incidents = list(IncidentFilter.by_text(incidents, text))
+        return incidents
+
     def get_history(self, limit: int = 50) -> List[Dict]:
         """Obtener historial de operaciones"""
-        return self.history[-limit:]
+        entries = [entry.to_dict() for entry in islice(reversed(self.history), limit)]
+        entries.reverse()
+        return entries
+
+    def get_history_recent(self, limit: int = 20) -> List[Dict]:
+        """Obtener las últimas operaciones, más recientes primero"""
+        return [entry.to_dict() for entry in islice(reversed(self.history), limit)]
 
     def get_operators(self) -> Dict[str, Operator]:
         """Obtener diccionario de operadores"""
         return self.operators.copy()
 
-    def add_operator(self, name: str, roles: tuple[str, ...]) -> bool:
+    def get_operators_for_type(self, incident_type: str) -> Set[str]:
+        """Obtener operadores disponibles que pueden atender un tipo de incidente"""
+        return set(self._op_by_type.get(incident_type, ()))
+
+    def set_operator_availability(self, name: str, available: bool) -> bool:
+        """Cambiar disponibilidad de un operador manteniendo la tabla de enrutamiento"""
+        if name not in self.operators:
+            logger.warning(f"Operador {name} no encontrado")
+            return False
+
+        operator = replace(self.operators[name], available=available)
+        self.operators[name] = operator
+        self._route_operator(operator)
+        self.version += 1
+        return True
+
+    def add_operator(self, name: str, roles: Iterable[str]) -> bool:
         """Agregar nuevo operador"""
         try:
             if not IncidentValidator.validate_operator_name(name):
                 logger.warning(f"Nombre de operador inválido: {name}")
                 return False
 
-            operator = Operator(name=name.strip(), roles=roles)
+            operator = Operator(name=name.strip(), roles=frozenset(roles))
             self.operators[operator.name] = operator
-            logger.info(f"Operador {name} agregado con roles: {', '.join(roles)}")
+            self._route_operator(operator)
+            self.version += 1
+            logger.info(f"Operador {name} agregado con roles: {', '.join(sorted(operator.roles))}")
             return True
 
         except Exception as e:
@@ -341,15 +531,19 @@ class IncidentDispatcher:
 
     def get_statistics(self) -> Dict[str, int]:
         """Obtener estadísticas del sistema"""
-        stats = defaultdict(int)
-
-        for incident in self.incidents.values():
-            stats[f"total"] += 1
-            stats[f"status_{incident.status}"] += 1
-            stats[f"priority_{incident.priority}"] += 1
-            stats[f"type_{incident.type}"] += 1
+        stats = {"total": len(self.incidents)}
+
+        # Estado y tipo salen de los índices; la prioridad se cuenta en C con Counter
+        for status, ids in self._by_status.items():
+            if ids:
+                stats[f"status_{status}"] = len(ids)
+        for priority, count in Counter(i.priority for i in self.incidents.values()).items():
+            stats[f"priority_{priority}"] = count
+        for incident_type, ids in self._by_type.items():
+            if ids:
+                stats[f"type_{incident_type}"] = len(ids)
 
         stats["operators_total"] = len(self.operators)
         stats["operators_available"] = sum(1 for op in self.operators.values() if op.available)
 
-        return dict(stats)
\ No newline at end of file
+        return stats
\ No newline at end of file
@@ -3,7 +3,7 @@ Sistema de escalamiento de incidentes
 """
 
 from datetime import datetime, timedelta
-from typing import Protocol, Callable, Iterator
+from typing import Protocol, Callable, Iterator, Optional
 from collections.abc import Iterable
 from incident.models import Incident
 import logging
@@ -14,7 +14,7 @@ logger = logging.getLogger(__name__)
 class EscalationStrategy(Protocol):
     """Protocolo para estrategias de escalamiento"""
 
-    def should_escalate(self, incident: Incident) -> bool:
+    def should_escalate(self, incident: Incident, now: datetime) -> bool:
         """Determinar si un incidente debe escalarse"""
         ...
 
@@ -24,14 +24,14 @@ class TimeBasedEscalation:
 
     def __init__(self, minutes_threshold: int = 30):
         self.minutes_threshold = minutes_threshold
+        self._threshold = timedelta(minutes=minutes_threshold)
 
-    def should_escalate(self, incident: Incident) -> bool:
+    def should_escalate(self, incident: Incident, now: datetime) -> bool:
         """Escalar si ha pasado más tiempo del umbral"""
         if incident.status not in ["pending", "in_progress"]:
             return False
 
-        time_elapsed = datetime.now() - incident.created_at
-        return time_elapsed > timedelta(minutes=self.minutes_threshold)
+        return now - incident.created_at > self._threshold
 
 
 class PriorityBasedEscalation:
@@ -39,8 +39,10 @@ class PriorityBasedEscalation:
 
     def __init__(self, auto_escalate_high: bool = True):
         self.auto_escalate_high = auto_escalate_high
+        # Escalar incidentes de alta prioridad después de 15 minutos
+        self._threshold = timedelta(minutes=15)
 
-    def should_escalate(self, incident: Incident) -> bool:
+    def should_escalate(self, incident: Incident, now: datetime) -> bool:
         """Escalar automáticamente incidentes de alta prioridad antiguos"""
         if not self.auto_escalate_high or incident.priority != "high":
             return False
@@ -48,9 +50,7 @@ class PriorityBasedEscalation:
         if incident.status not in ["pending", "in_progress"]:
             return False
 
-        # Escalar incidentes de alta prioridad después de 15 minutos
-        time_elapsed = datetime.now() - incident.created_at
-        return time_elapsed > timedelta(minutes=15)
+        return now - incident.created_at > self._threshold
 
 
 class CompositeEscalation:
@@ -59,17 +59,17 @@ class CompositeEscalation:
     def __init__(self, *strategies: EscalationStrategy):
         self.strategies = strategies
 
-    def should_escalate(self, incident: Incident) -> bool:
+    def should_escalate(self, incident: Incident, now: datetime) -> bool:
         """Escalar si cualquier estrategia lo indica"""
-        return any(strategy.should_escalate(incident) for strategy in self.strategies)
+        return any(strategy.should_escalate(incident, now) for strategy in self.strategies)
 
 
-def create_escalation_closure(strategy: EscalationStrategy) -> Callable[[Incident], bool]:
+def create_escalation_closure(strategy: EscalationStrategy) -> Callable[..., bool]:
     """Crear un closure para estrategia de escalamiento"""
 
-    def escalation_func(incident: Incident) -> bool:
+    def escalation_func(incident: Incident, now: Optional[datetime] = None) -> bool:
         try:
-            return strategy.should_escalate(incident)
+            return strategy.should_escalate(incident, now or datetime.now())
         except Exception as e:
             logger.error(f"Error en estrategia de escalamiento: {e}")
             return False
@@ -86,14 +86,16 @@ class IncidentEscalator:
             PriorityBasedEscalation(True)
         )
 
-    def find_escalatable_incidents(self, incidents: Iterable[Incident]) -> Iterator[Incident]:
+    def find_escalatable_incidents(self, incidents: Iterable[Incident],
+                                   log_level: int = logging.INFO) -> Iterator[Incident]:
         """Encontrar incidentes que deben escalarse"""
+        now = datetime.now()
         for incident in incidents:
-            if self.strategy.should_escalate(incident):
-                logger.info(f"Incidente {incident.id} marcado para escalamiento")
+            if self.strategy.should_escalate(incident, now):
+                logger.log(log_level, f"Incidente {incident.id} marcado para escalamiento")
                 yield incident
 
-    def escalate_incident(self, incident: Incident) -> Incident:
+    def escalate_incident(self, incident: Incident, log_level: int = logging.WARNING) -> Incident:
         """Escalar un incidente específico"""
-        logger.warning(f"Escalando incidente {incident.id}: {incident.description[:50]}...")
+        logger.log(log_level, f"Escalando incidente {incident.id}: {incident.description[:50]}...")
         return incident.with_status("escalated")
@@ -19,7 +19,7 @@ def validate_input(validator_func: Callable[[Any], bool], error_message: str):
         def wrapper(*args, **kwargs):
             # Validar el primer argumento después de self
             if len(args) > 1 and not validator_func(args[1]):
-                logger.warning(f"Validación fallida: {error_message}")
+                logger.warning("Validación fallida: %s", error_message)
                 raise ValueError(error_message)
             return func(*args, **kwargs)
 
@@ -34,14 +34,45 @@ def log_operation(operation_name: str):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            logger.info(f"Iniciando operación: {operation_name}")
+            # Solo los mensajes de debug dependen del nivel; los errores se registran siempre
+            log_enabled = logger.isEnabledFor(logging.DEBUG)
+            if log_enabled:
+                logger.debug("Iniciando operación: %s", operation_name)
             try:
                 result = func(*args, **kwargs)
-                logger.info(f"Operación completada: {operation_name}")
-                return result
             except Exception as e:
-                logger.error(f"Error en operación {operation_name}: {e}")
+                logger.error("Error en operación %s: %s", operation_name, e)
                 raise
+            if log_enabled:
+                logger.debug("Operación completada: %s", operation_name)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def validated_operation(operation_name: str, validator_func: Callable[[Any], bool], error_message: str):
+    """Decorador que combina validate_input y log_operation en un solo wrapper"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            log_enabled = logger.isEnabledFor(logging.DEBUG)
+            if log_enabled:
+                logger.debug("Iniciando operación: %s", operation_name)
+            try:
+                # Validar el primer argumento después de self
+                if len(args) > 1 and not validator_func(args[1]):
+                    logger.warning("Validación fallida: %s", error_message)
+                    raise ValueError(error_message)
+                result = func(*args, **kwargs)
+            except Exception as e:
+                logger.error("Error en operación %s: %s", operation_name, e)
+                raise
+            if log_enabled:
+                logger.debug("Operación completada: %s", operation_name)
+            return result
 
         return wrapper
 
@@ -51,9 +82,17 @@ def log_operation(operation_name: str):
 class IncidentValidator:
     """Validador para datos de incidentes"""
 
-    VALID_TYPES = {"infrastructure", "security", "application"}
-    VALID_PRIORITIES = {"high", "medium", "low"}
-    VALID_STATUSES = {"pending", "in_progress", "resolved", "escalated"}
+    VALID_TYPES = frozenset({"infrastructure", "security", "application"})
+    VALID_PRIORITIES = frozenset({"high", "medium", "low"})
+    VALID_STATUSES = frozenset({"pending", "in_progress", "resolved", "escalated"})
+
+    # Mensajes de error precalculados
+    _TYPES_ERR = f"Tipo inválido. Debe ser uno de: {', '.join(sorted(VALID_TYPES))}"
+    _PRIORITIES_ERR = f"Prioridad inválida. Debe ser una de: {', '.join(sorted(VALID_PRIORITIES))}"
+    _DESCRIPTION_ERR = "Descripción debe tener entre 5 y 500 caracteres"
+
+    # Solo letras, números y espacios, 2-50 caracteres
+    _OPERATOR_NAME_RE = re.compile(r'^[a-zA-Z0-9\s]{2,50}$')
 
     @classmethod
     def validate_type(cls, incident_type: str) -> bool:
@@ -80,8 +119,7 @@ class IncidentValidator:
         """Validar nombre de operador"""
         if not isinstance(name, str):
             return False
-        # Solo letras, números y espacios, 2-50 caracteres
-        return bool(re.match(r'^[a-zA-Z0-9\s]{2,50}$', name.strip()))
+        return bool(cls._OPERATOR_NAME_RE.match(name.strip()))
 
     @classmethod
     def validate_all_incident_data(cls, incident_type: str, priority: str, description: str) -> list[str]:
@@ -89,12 +127,20 @@ class IncidentValidator:
         errors = []
 
         if not cls.validate_type(incident_type):
-            errors.append(f"Tipo inválido. Debe ser uno de: {', '.join(cls.VALID_TYPES)}")
+            errors.append(cls._TYPES_ERR)
 
         if not cls.validate_priority(priority):
-            errors.append(f"Prioridad inválida. Debe ser una de: {', '.join(cls.VALID_PRIORITIES)}")
+            errors.append(cls._PRIORITIES_ERR)
 
         if not cls.validate_description(description):
-            errors.append("Descripción debe tener entre 5 y 500 caracteres")
+            errors.append(cls._DESCRIPTION_ERR)
 
-        return errors
\ No newline at end of file
+        return errors
+
+    @classmethod
+    def validate_all_incident_data_fast(cls, incident_type: str, priority: str, description: str) -> bool:
+        """Validar todos los datos de un incidente sin construir mensajes de error"""
+        return (incident_type in cls.VALID_TYPES
+                and priority in cls.VALID_PRIORITIES
+                and isinstance(description, str)
+                and 5 <= len(description.strip()) <= 500)
\ No newline at end of file
@@ -3,29 +3,60 @@ Filtros y búsquedas para incidentes
 """
 
 import re
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import Iterator, Optional, Callable
+from typing import Iterator, Optional, Callable, Union
 from collections.abc import Iterable
 from .models import Incident
 
+# Caracteres con significado especial en expresiones regulares
+_REGEX_META = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+
+@lru_cache(maxsize=128)
+def _compile(pattern: str, flags: int = re.IGNORECASE) -> re.Pattern:
+    """Compilar patrón, reutilizando el resultado en búsquedas repetidas"""
+    return re.compile(pattern, flags)
+
+
+def _resolve_pattern(pattern: Union[str, re.Pattern]) -> Optional[re.Pattern]:
+    """Obtener el regex a aplicar, o None si basta una búsqueda literal"""
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    if not _REGEX_META.search(pattern):
+        return None
+    try:
+        return _compile(pattern)
+    except re.error:
+        # Si el regex es inválido, buscar texto literal
+        return None
+
 
 class IncidentFilter:
     """Clase para filtrar incidentes con diferentes criterios"""
 
     @staticmethod
-    def by_text(incidents: Iterable[Incident], pattern: str) -> Iterator[Incident]:
-        """Filtrar por texto usando regex en descripción"""
-        try:
-            regex = re.compile(pattern, re.IGNORECASE)
-            for incident in incidents:
-                if regex.search(incident.description):
-                    yield incident
-        except re.error:
-            # Si el regex es inválido, buscar texto literal
-            pattern_lower = pattern.lower()
-            for incident in incidents:
-                if pattern_lower in incident.description.lower():
-                    yield incident
+    def by_text(incidents: Iterable[Incident], pattern: Union[str, re.Pattern]) -> Iterator[Incident]:
+        """Filtrar por texto usando regex en descripción (acepta un patrón ya compilado)"""
+        # El patrón se resuelve al llamar, no dentro del generador
+        regex = _resolve_pattern(pattern)
+        if regex is None:
+            return IncidentFilter._by_literal(incidents, pattern.lower())
+        return IncidentFilter._by_regex(incidents, regex)
+
+    @staticmethod
+    def _by_literal(incidents: Iterable[Incident], pattern_lower: str) -> Iterator[Incident]:
+        """Filtrar por subcadena sin usar el motor de regex"""
+        for incident in incidents:
+            if pattern_lower in incident._desc_lower:
+                yield incident
+
+    @staticmethod
+    def _by_regex(incidents: Iterable[Incident], regex: re.Pattern) -> Iterator[Incident]:
+        """Filtrar por expresión regular compilada"""
+        for incident in incidents:
+            if regex.search(incident.description):
+                yield incident
 
     @staticmethod
     def by_type(incidents: Iterable[Incident], incident_type: str) -> Iterator[Incident]:
@@ -2,15 +2,39 @@
 Modelos de datos para el sistema de gestión de incidentes
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from operator import itemgetter
 from datetime import datetime
 from typing import Optional, Literal
 import json
+import sys
 
 IncidentType = Literal["infrastructure", "security", "application"]
 Priority = Literal["high", "medium", "low"]
 Status = Literal["pending", "in_progress", "resolved", "escalated"]
 
+# Valores internados: todas las instancias comparten el mismo objeto str
+_TYPES = {t: sys.intern(t) for t in ("infrastructure", "security", "application")}
+_PRIORITIES = {p: sys.intern(p) for p in ("high", "medium", "low")}
+_STATUSES = {s: sys.intern(s) for s in ("pending", "in_progress", "resolved", "escalated")}
+
+
+# Campos de un registro serializado, en el orden del constructor
+_ROW_FIELDS = itemgetter('id', 'type', 'priority', 'description', 'created_at', 'assigned_to', 'status')
+
+
+def _interned(table: dict, value: str, field_name: str) -> str:
+    """Obtener la versión internada de un valor, fallando si no es válido"""
+    try:
+        return table[value]
+    except KeyError:
+        raise ValueError(f"Valor inválido para {field_name}: {value!r}") from None
+
+
+def _truncate(text: str, length: int) -> str:
+    """Recortar texto agregando '...' si excede la longitud"""
+    return text[:length] + ('...' if len(text) > length else '')
+
 
 @dataclass(frozen=True, slots=True)
 class Incident:
@@ -22,15 +46,27 @@ class Incident:
     created_at: datetime
     assigned_to: Optional[str]
     status: Status
+    # Descripciones truncadas, calculadas una vez al crear la instancia
+    desc_short_60: str = field(init=False, repr=False, compare=False)
+    desc_short_40: str = field(init=False, repr=False, compare=False)
+    _desc_lower: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'type', _interned(_TYPES, self.type, 'type'))
+        object.__setattr__(self, 'priority', _interned(_PRIORITIES, self.priority, 'priority'))
+        object.__setattr__(self, 'status', _interned(_STATUSES, self.status, 'status'))
+        object.__setattr__(self, 'desc_short_60', _truncate(self.description, 60))
+        object.__setattr__(self, 'desc_short_40', _truncate(self.description, 40))
+        object.__setattr__(self, '_desc_lower', self.description.lower())
 
     def to_dict(self) -> dict:
-        """Convertir a diccionario para serialización JSON"""
+        """Convertir a diccionario para serialización (created_at queda como datetime)"""
         return {
             'id': self.id,
             'type': self.type,
             'priority': self.priority,
             'description': self.description,
-            'created_at': self.created_at.isoformat(),
+            'created_at': self.created_at,
             'assigned_to': self.assigned_to,
             'status': self.status
         }
@@ -38,48 +74,52 @@ class Incident:
     @classmethod
     def from_dict(cls, data: dict) -> 'Incident':
         """Crear instancia desde diccionario"""
-        return cls(
-            id=data['id'],
-            type=data['type'],
-            priority=data['priority'],
-            description=data['description'],
-            created_at=datetime.fromisoformat(data['created_at']),
-            assigned_to=data['assigned_to'],
-            status=data['status']
-        )
+        return cls._from_row(*_ROW_FIELDS(data))
+
+    @classmethod
+    def _from_row(cls, id: int, type: str, priority: str, description: str,
+                  created_at, assigned_to: Optional[str], status: str) -> 'Incident':
+        """Crear instancia con argumentos posicionales (ruta rápida de carga)"""
+        if not isinstance(created_at, datetime):
+            created_at = datetime.fromisoformat(created_at)
+        return cls(id, type, priority, description, created_at, assigned_to, status)
+
+    def _evolve(self, assigned_to: Optional[str], status: str) -> 'Incident':
+        """Copiar la instancia cambiando asignación y estado (ya internado)
+
+        Evita __init__/__post_init__: los campos derivados de la descripción se reutilizan.
+        """
+        new = object.__new__(Incident)
+        _set = object.__setattr__
+        _set(new, 'id', self.id)
+        _set(new, 'type', self.type)
+        _set(new, 'priority', self.priority)
+        _set(new, 'description', self.description)
+        _set(new, 'created_at', self.created_at)
+        _set(new, 'assigned_to', assigned_to)
+        _set(new, 'status', status)
+        _set(new, 'desc_short_60', self.desc_short_60)
+        _set(new, 'desc_short_40', self.desc_short_40)
+        _set(new, '_desc_lower', self._desc_lower)
+        return new
 
     def with_status(self, new_status: Status) -> 'Incident':
         """Crear nueva instancia con estado actualizado"""
-        return Incident(
-            id=self.id,
-            type=self.type,
-            priority=self.priority,
-            description=self.description,
-            created_at=self.created_at,
-            assigned_to=self.assigned_to,
-            status=new_status
-        )
+        return self._evolve(self.assigned_to, _interned(_STATUSES, new_status, 'status'))
 
     def with_assignment(self, operator: str) -> 'Incident':
         """Crear nueva instancia con operador asignado"""
-        return Incident(
-            id=self.id,
-            type=self.type,
-            priority=self.priority,
-            description=self.description,
-            created_at=self.created_at,
-            assigned_to=operator,
-            status="in_progress"
-        )
+        return self._evolve(operator, _STATUSES["in_progress"])
 
 
 @dataclass(frozen=True, slots=True)
 class Operator:
     """Estructura de un operador"""
     name: str
-    roles: tuple[str, ...]
+    roles: frozenset[str]
     available: bool = True
 
-    def can_handle(self, incident_type: str) -> bool:
-        """Verificar si el operador puede manejar un tipo de incidente"""
-        return incident_type in self.roles
\ No newline at end of file
+    def __post_init__(self):
+        # Aceptar cualquier iterable de roles; el frozenset da búsquedas O(1)
+        if not isinstance(self.roles, frozenset):
+            object.__setattr__(self, 'roles', frozenset(self.roles))
\ No newline at end of file
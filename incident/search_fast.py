@@ -0,0 +1,78 @@
+"""
+Filtrado acelerado con Numba para historiales grandes de incidentes
+"""
+
+import os
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from .models import Incident
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:  # Dependencias opcionales
+    np = None
+    njit = None
+
+# INCIDENTS_DISABLE_JIT=1 desactiva la ruta compilada (útil en desarrollo)
+JIT_ENABLED = njit is not None and os.environ.get("INCIDENTS_DISABLE_JIT", "") != "1"
+
+# Por debajo de este tamaño el filtrado en Python puro es suficiente
+MIN_INCIDENTS = 1000
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(moment: datetime) -> int:
+    """Fecha naive a microsegundos enteros; conserva exactamente el orden de datetime"""
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def _filter(created_us, count, min_us):
+    """Índices de las primeras `count` filas creadas desde `min_us`"""
+    out = np.empty(count, dtype=np.int64)
+    found = 0
+    for i in range(count):
+        if created_us[i] >= min_us:
+            out[found] = i
+            found += 1
+    return out[:found]
+
+
+if JIT_ENABLED:
+    _filter = njit(cache=True)(_filter)
+
+
+class IncidentArrays:
+    """Fechas de creación en un arreglo contiguo, actualizado de forma incremental"""
+
+    def __init__(self, incidents: Iterable[Incident]):
+        self.rows: List[Incident] = []
+        self._positions: Dict[int, int] = {}  # id -> fila
+        self._created_us = np.empty(MIN_INCIDENTS, dtype=np.int64)
+        for incident in incidents:
+            self.upsert(incident)
+
+    def upsert(self, incident: Incident):
+        """Agregar un incidente o reemplazar su versión anterior"""
+        position = self._positions.get(incident.id)
+        if position is not None:
+            # created_at no cambia entre versiones de un incidente
+            self.rows[position] = incident
+            return
+
+        position = len(self.rows)
+        if position == self._created_us.shape[0]:
+            # Crecimiento geométrico: agregar es O(1) amortizado
+            self._created_us = np.resize(self._created_us, position * 2)
+        self._created_us[position] = to_micros(incident.created_at)
+        self._positions[incident.id] = position
+        self.rows.append(incident)
+
+    def filter(self, start_date: datetime) -> List[Incident]:
+        """Incidentes creados desde `start_date`, en orden de inserción"""
+        indices = _filter(self._created_us, len(self.rows), to_micros(start_date))
+        return [self.rows[i] for i in indices]
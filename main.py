@@ -4,6 +4,7 @@ Simulador de Gestión de Incidentes y Flujos de Escalamiento
 Punto de entrada principal del sistema
 """
 
+import asyncio
 import sys
 import os
 from pathlib import Path
@@ -43,7 +44,7 @@ def main():
         cli = IncidentManagerCLI(dispatcher)
 
         # Ejecutar interfaz CLI
-        cli.run()
+        asyncio.run(cli.run())
 
     except KeyboardInterrupt:
         print("\n👋 Sistema cerrado por el usuario")
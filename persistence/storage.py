@@ -2,25 +2,197 @@
 Gestión de persistencia de datos
 """
 
+import gzip
 import json
+import mmap
 import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set
 from pathlib import Path
 import logging
 
+try:
+    import orjson
+except ImportError:  # Dependencia opcional
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # Dependencia opcional
+    ijson = None
+
+try:
+    import zstandard
+except ImportError:  # Dependencia opcional
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:  # Dependencia opcional
+    msgpack = None
+
 logger = logging.getLogger(__name__)
 
+# Compactar el journal cuando supere N veces el tamaño del snapshot (con un mínimo en bytes)
+JOURNAL_COMPACTION_RATIO = 10
+JOURNAL_COMPACTION_MIN_BYTES = 64 * 1024
+
+# INCIDENTS_BINARY_SNAPSHOT=1 guarda el snapshot en msgpack (incidents.msgpack) en lugar de JSON
+BINARY_SNAPSHOT = msgpack is not None and os.environ.get("INCIDENTS_BINARY_SNAPSHOT", "") == "1"
+
+# INCIDENTS_GZIP_SNAPSHOT=1 comprime el snapshot con gzip (incidents.json.gz / incidents.msgpack.gz)
+GZIP_SNAPSHOT = os.environ.get("INCIDENTS_GZIP_SNAPSHOT", "") == "1"
+GZIP_LEVEL = 3
+
+# Extensiones de backup reconocidas al limpiar (JSON o msgpack, opcionalmente comprimidos)
+_BACKUP_SUFFIXES = (".json", ".json.zst", ".json.gz", ".msgpack", ".msgpack.zst", ".msgpack.gz")
+
+# Segundos mínimos entre backups del snapshot (0 = en cada guardado, None = desactivados)
+BACKUP_INTERVAL = 3600
+
+# Cantidad de backups que se conservan
+BACKUP_KEEP = 5
+
+
+def _json_default(value: Any) -> Any:
+    """Serializar tipos no nativos de json (fechas en ISO 8601)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _dumps(payload: Any, pretty: bool = False) -> bytes:
+    """Serializar el snapshot completo a bytes JSON (compacto salvo que se pida `pretty`)"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(payload, option=option)
+    if pretty:
+        return json.dumps(payload, indent=2, ensure_ascii=False, default=_json_default).encode('utf-8')
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False,
+                      default=_json_default).encode('utf-8')
+
+
+def _loads(data: bytes) -> Any:
+    """Parsear bytes JSON"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps_line(record: Dict[str, Any]) -> bytes:
+    """Serializar un registro como una línea JSON en bytes"""
+    if orjson is not None:
+        # orjson serializa datetime de forma nativa; sin OPT_NAIVE_UTC las
+        # fechas naive se escriben igual que datetime.isoformat()
+        return orjson.dumps(record) + b'\n'
+    return json.dumps(record, ensure_ascii=False, default=_json_default).encode('utf-8') + b'\n'
+
+
+def _packb(value: Any) -> bytes:
+    """Serializar a msgpack (fechas en ISO 8601, igual que en JSON)"""
+    return msgpack.packb(value, use_bin_type=True, default=_json_default)
+
+
+def _loads_buffer(buffer: mmap.mmap) -> Any:
+    """Parsear JSON directamente desde un buffer mapeado"""
+    if orjson is not None:
+        with memoryview(buffer) as view:
+            return orjson.loads(view)
+    return json.loads(buffer[:])
+
+
+def _write_all(f, data: bytes):
+    """Escribir un buffer completo en un archivo sin búfer (write puede ser parcial)"""
+    view = memoryview(data)
+    while view:
+        view = view[f.write(view):]
+
+
+def _backup_key(name: str) -> int:
+    """Orden cronológico de un backup según su nombre, sin stat
+
+    Los nombres llevan nanosegundos desde epoch (o %Y%m%d_%H%M%S en backups antiguos,
+    que como número siempre quedan por debajo).
+    """
+    stamp = name[len("incidents_backup_"):].split('.', 1)[0].replace('_', '')
+    return int(stamp) if stamp.isdigit() else 0
+
+
+# Variantes posibles del snapshot; el journal JSON Lines es común a todas
+_SNAPSHOT_NAMES = ("incidents.json", "incidents.json.gz", "incidents.msgpack", "incidents.msgpack.gz")
+
+
+def _is_binary(path: Path) -> bool:
+    """Verificar si un snapshot está en msgpack según su nombre"""
+    return path.name.startswith("incidents.msgpack")
+
+
+def _is_compressed(path: Path) -> bool:
+    """Verificar si un snapshot está comprimido con gzip según su nombre"""
+    return path.suffix == ".gz"
+
 
 class StorageManager:
     """Gestor de almacenamiento de datos"""
 
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", backup_interval: Optional[float] = BACKUP_INTERVAL,
+                 binary: bool = BINARY_SNAPSHOT, compressed: bool = GZIP_SNAPSHOT):
         self.data_dir = Path(data_dir)
-        self.incidents_file = self.data_dir / "incidents.json"
+        self.binary = binary and msgpack is not None
+        self.compressed = compressed
+        snapshot_name = "incidents.msgpack" if self.binary else "incidents.json"
+        if self.compressed:
+            snapshot_name += ".gz"
+        self.incidents_file = self.data_dir / snapshot_name
+        # Archivo que contiene hoy el snapshot: otra variante si se cambió de formato
+        # (se migra al formato elegido en el próximo guardado)
+        self.snapshot_source = self._find_snapshot()
+        self.journal_file = self.data_dir / "incidents.journal.jsonl"
+        self.compacting_file = self.data_dir / "incidents.journal.compacting.jsonl"
         self.backup_dir = self.data_dir / "backups"
+        self._frag_cache: Dict[int, bytes] = {}  # id -> JSON del incidente en el último snapshot
+        self.backup_interval = backup_interval
+        self._last_backup: Optional[float] = None  # time.monotonic() del último backup
+        self._last_payload_hash: Optional[int] = None  # Hash de los incidentes del último snapshot
+        self._journal_lock = threading.Lock()  # Escrituras y rotación del journal
+        self._snapshot_lock = threading.RLock()  # Una sola reescritura del snapshot a la vez
         self._ensure_directories()
 
+        # Una línea incompleta al final se pegaría al próximo registro agregado
+        for journal in (self.compacting_file, self.journal_file):
+            self._repair_journal_tail(journal)
+
+        # Anillo con los backups vigentes (del más antiguo al más nuevo); un solo recorrido
+        # del directorio al iniciar y ninguno por guardado
+        self._backup_ring: deque = deque(self._cleanup_old_backups(), maxlen=BACKUP_KEEP)
+
+        # Compactaciones en segundo plano; maxsize=1 agrupa las solicitudes mientras el escritor trabaja
+        self._pending: queue.Queue = queue.Queue(maxsize=1)
+        self._writer = threading.Thread(target=self._writer_loop, name="storage-writer", daemon=True)
+        self._writer.start()
+
+    def _find_snapshot(self) -> Path:
+        """Ubicar el snapshot existente, aunque esté en un formato distinto al elegido"""
+        if self.incidents_file.exists():
+            return self.incidents_file
+        for name in _SNAPSHOT_NAMES:
+            candidate = self.data_dir / name
+            if not candidate.exists():
+                continue
+            if _is_binary(candidate) and msgpack is None:
+                # Arrancar vacío reutilizaría ids y el journal pisaría esos incidentes
+                raise RuntimeError(f"El snapshot {candidate} requiere msgpack para leerse")
+            logger.info(f"Usando snapshot {candidate.name}; se migrará a {self.incidents_file.name}")
+            return candidate
+        return self.incidents_file
+
     def _ensure_directories(self):
         """Crear directorios necesarios"""
         try:
@@ -31,35 +203,285 @@ class StorageManager:
             logger.error(f"Error creando directorios: {e}")
             raise
 
-    def save_incidents(self, incidents_data: List[Dict[str, Any]]):
-        """Guardar incidentes en JSON"""
+    def save_incidents(self, incidents_data: List[Dict[str, Any]], pretty: bool = False):
+        """Guardar incidentes en JSON (con `pretty` se indenta para lectura humana)"""
+        if not pretty or self.binary:
+            self.save_incidents_cached(incidents_data, dirty_ids=None)
+            return
         try:
-            # Crear backup si existe archivo previo
-            if self.incidents_file.exists():
-                self._create_backup()
+            payload = _dumps({
+                'timestamp_ns': time.time_ns(),
+                'incidents': incidents_data
+            }, pretty)
+            with self._snapshot_lock:
+                # Los fragmentos en caché podrían no reflejar lo que se acaba de escribir
+                self._frag_cache.clear()
+                self._last_payload_hash = None
+                self._write_snapshot(payload, len(incidents_data),
+                                     (self.compacting_file, self.journal_file))
+        except Exception as e:
+            logger.error(f"Error guardando incidentes: {e}")
+            raise
+
+    def save_incidents_cached(self, incidents_data: List[Dict[str, Any]],
+                              dirty_ids: Optional[Set[int]]):
+        """Guardar reutilizando el JSON ya serializado de los incidentes sin cambios
 
-            # Guardar datos
-            with open(self.incidents_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'timestamp': datetime.now().isoformat(),
-                    'incidents': incidents_data
-                }, f, indent=2, ensure_ascii=False)
+        Solo se serializan los incidentes de `dirty_ids` (todos si es None).
+        """
+        self._save_cached(incidents_data, dirty_ids, (self.compacting_file, self.journal_file))
+
+    def _save_cached(self, incidents_data: List[Dict[str, Any]],
+                     dirty_ids: Optional[Set[int]], consumed: Iterable[Path]):
+        """Serializar con la caché de fragmentos y publicar, borrando los journals `consumed`"""
+        try:
+            with self._snapshot_lock:
+                fragments = []
+                cache: Dict[int, bytes] = {}
+                encode = _packb if self.binary else _dumps
+                for incident in incidents_data:
+                    incident_id = incident['id']
+                    fragment = self._frag_cache.get(incident_id)
+                    if fragment is None or dirty_ids is None or incident_id in dirty_ids:
+                        fragment = encode(incident)
+                    cache[incident_id] = fragment
+                    fragments.append(fragment)
+                # Reemplazar la caché descarta los incidentes que ya no existen
+                self._frag_cache = cache
 
-            logger.info(f"Guardados {len(incidents_data)} incidentes")
+                # Sin cambios de contenido no se reescribe ni se crea backup
+                # (bytes guarda su hash, así los fragmentos reutilizados no se vuelven a recorrer)
+                payload_hash = hash(tuple(fragments))
+                if payload_hash == self._last_payload_hash and self.snapshot_source.exists():
+                    self._discard_journals(consumed)
+                    logger.debug("Snapshot sin cambios, guardado omitido")
+                    return
 
+                # Entero en nanosegundos: se formatea como fecha solo al leerlo
+                timestamp_ns = time.time_ns()
+                if self.binary:
+                    # Un array msgpack es su cabecera seguida de los elementos ya serializados
+                    packer = msgpack.Packer(use_bin_type=True)
+                    payload = b''.join((
+                        packer.pack_map_header(2), packer.pack('timestamp_ns'), packer.pack(timestamp_ns),
+                        packer.pack('incidents'), packer.pack_array_header(len(fragments)), *fragments
+                    ))
+                else:
+                    payload = b''.join((
+                        b'{"timestamp_ns":', b'%d' % timestamp_ns,
+                        b',"incidents":[', b','.join(fragments), b']}'
+                    ))
+                self._write_snapshot(payload, len(fragments), consumed)
+                self._last_payload_hash = payload_hash
         except Exception as e:
             logger.error(f"Error guardando incidentes: {e}")
             raise
 
+    def _write_snapshot(self, payload: bytes, count: int, consumed: Iterable[Path]):
+        """Publicar el snapshot serializado y borrar los journals que ya incluye"""
+        # Guardar datos en una sola escritura de bytes sobre un archivo temporal,
+        # con fsync para que el rename nunca publique un archivo incompleto
+        if self.compressed:
+            payload = gzip.compress(payload, compresslevel=GZIP_LEVEL)
+        tmp_file = self.incidents_file.with_name(self.incidents_file.name + '.tmp')
+        with open(tmp_file, 'wb', buffering=0) as f:
+            _write_all(f, payload)
+            os.fsync(f.fileno())
+
+        # Backup periódico del archivo previo (hardlink al inodo actual)
+        if self.snapshot_source.exists() and self._backup_due():
+            self._create_backup()
+
+        # Publicar de forma atómica; el backup conserva el inodo anterior
+        os.replace(tmp_file, self.incidents_file)
+
+        # Migración de formato completa: el snapshot anterior ya está incluido
+        if self.snapshot_source != self.incidents_file:
+            self.snapshot_source.unlink(missing_ok=True)
+            self.snapshot_source = self.incidents_file
+
+        self._discard_journals(consumed)
+        logger.info(f"Guardados {count} incidentes")
+
+    def _discard_journals(self, consumed: Iterable[Path]):
+        """Borrar journals cuyos cambios ya están en el snapshot"""
+        with self._journal_lock:
+            for journal in consumed:
+                journal.unlink(missing_ok=True)
+
+    def append_events(self, events: List[Dict[str, Any]], log_level: int = logging.INFO):
+        """Agregar incidentes modificados al journal en una sola escritura con fsync"""
+        if not events:
+            return
+        try:
+            data = b''.join(_dumps_line(event) for event in events)
+            with self._journal_lock, open(self.journal_file, 'ab', buffering=0) as f:
+                _write_all(f, data)
+                os.fsync(f.fileno())
+
+            logger.log(log_level, f"Registrados {len(events)} cambios en el journal")
+
+            if self._needs_compaction():
+                self.request_compaction()
+
+        except Exception as e:
+            logger.error(f"Error escribiendo journal: {e}")
+            raise
+
+    def append_incident(self, incident: Dict[str, Any]):
+        """Agregar un solo incidente al journal (una línea JSON)"""
+        self.append_events([incident])
+
+    def request_compaction(self):
+        """Pedir una compactación en segundo plano sin bloquear (las solicitudes se agrupan)"""
+        try:
+            self._pending.put_nowait(True)
+        except queue.Full:
+            pass  # Ya hay una compactación pendiente que incluirá estos cambios
+
+    def close(self):
+        """Detener el hilo escritor después de la compactación en curso"""
+        if not self._writer.is_alive():
+            return
+        # Bloquea hasta que el hilo tome la solicitud pendiente, si la hay
+        self._pending.put(None)
+        self._writer.join()
+
+    def _writer_loop(self):
+        """Hilo escritor: ejecutar las compactaciones solicitadas hasta recibir None"""
+        while self._pending.get() is not None:
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Error compactando en segundo plano: {e}")
+
+    def compact(self):
+        """Reescribir el snapshot con el estado actual y vaciar el journal"""
+        with self._snapshot_lock:
+            # Las escrituras nuevas siguen en un journal vacío mientras se compacta
+            self._rotate_journal()
+            if not self.compacting_file.exists():
+                return
+            # Solo los incidentes del journal cambiaron desde el último snapshot
+            changes = self._read_journal(self.compacting_file)
+            dirty_ids = set(changes)
+            self._save_cached(list(self._merge_journal(changes)), dirty_ids, (self.compacting_file,))
+
+    def _rotate_journal(self):
+        """Mover el journal activo al archivo de compactación"""
+        with self._journal_lock:
+            if not self.journal_file.exists():
+                return
+            if self.compacting_file.exists():
+                # Quedó una compactación interrumpida: acumular en el mismo archivo
+                with open(self.journal_file, 'rb') as src, open(self.compacting_file, 'ab') as dst:
+                    shutil.copyfileobj(src, dst)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                self.journal_file.unlink()
+            else:
+                os.replace(self.journal_file, self.compacting_file)
+
+    def _needs_compaction(self) -> bool:
+        """Verificar si el journal creció lo suficiente para compactar"""
+        try:
+            journal_size = self.journal_file.stat().st_size
+        except FileNotFoundError:
+            return False  # Otro hilo acaba de rotarlo
+        snapshot_size = self.snapshot_source.stat().st_size if self.snapshot_source.exists() else 0
+        return journal_size > max(JOURNAL_COMPACTION_RATIO * snapshot_size, JOURNAL_COMPACTION_MIN_BYTES)
+
     def load_incidents(self) -> List[Dict[str, Any]]:
-        """Cargar incidentes desde JSON"""
+        """Cargar incidentes desde el snapshot JSON y reaplicar el journal"""
+        return list(self.iter_incidents())
+
+    def iter_incidents(self) -> Iterator[Dict[str, Any]]:
+        """Recorrer los incidentes persistidos (snapshot + journal) de a uno"""
+        # Un journal en compactación es anterior al activo
+        changes = self._read_journal(self.compacting_file)
+        changes.update(self._read_journal(self.journal_file))
+        return self._merge_journal(changes)
+
+    def _merge_journal(self, changes: Dict[int, Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Recorrer el snapshot aplicando los cambios del journal"""
+        if changes:
+            logger.info(f"Reaplicados {len(changes)} cambios desde el journal")
+
+        for record in self._load_snapshot():
+            yield changes.pop(record['id'], record)
+
+        # Incidentes creados después del último snapshot
+        yield from changes.values()
+
+    def _repair_journal_tail(self, journal: Path):
+        """Recortar una última línea incompleta dejada por una escritura interrumpida"""
+        try:
+            with open(journal, 'r+b') as f:
+                size = f.seek(0, os.SEEK_END)
+                keep = 0
+                end = size
+                # Buscar el último salto de línea leyendo desde el final por bloques
+                while end > 0:
+                    start = max(0, end - 4096)
+                    f.seek(start)
+                    newline = f.read(end - start).rfind(b'\n')
+                    if newline != -1:
+                        keep = start + newline + 1
+                        break
+                    end = start
+                if keep < size:
+                    f.truncate(keep)
+                    os.fsync(f.fileno())
+                    logger.warning(f"Journal {journal.name}: descartados {size - keep} bytes incompletos")
+        except FileNotFoundError:
+            pass
+
+    def _read_journal(self, journal: Path) -> Dict[int, Dict[str, Any]]:
+        """Leer un journal y quedarse con la última versión de cada incidente"""
+        changes: Dict[int, Dict[str, Any]] = {}
+        if not journal.exists():
+            return changes
+
+        try:
+            with open(journal, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = _loads(line)
+                        changes[record['id']] = record
+                    except (ValueError, KeyError, TypeError):
+                        # Línea dañada (JSON o UTF-8 inválido, registro sin id): solo se pierde esa
+                        logger.warning("Entrada de journal inválida ignorada")
+        except Exception as e:
+            logger.error(f"Error leyendo journal: {e}")
+        return changes
+
+    def _load_snapshot(self) -> Iterable[Dict[str, Any]]:
+        """Cargar el snapshot de incidentes (en streaming si ijson está disponible)"""
         try:
-            if not self.incidents_file.exists():
+            source = self.snapshot_source
+            if not source.exists():
                 logger.info("No se encontró archivo de incidentes, iniciando con datos vacíos")
                 return []
 
-            with open(self.incidents_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if source.stat().st_size == 0:
+                logger.error("Error decodificando JSON: archivo de incidentes vacío")
+                return []
+
+            binary = _is_binary(source)
+            if ijson is not None and not binary:
+                return self._stream_snapshot(source)
+
+            if _is_compressed(source):
+                with gzip.open(source, 'rb') as f:
+                    raw = f.read()
+                data = msgpack.unpackb(raw, raw=False) if binary else _loads(raw)
+            else:
+                # mmap evita copiar el archivo a un buffer intermedio antes de parsearlo
+                with open(source, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    data = msgpack.unpackb(mm, raw=False) if binary else _loads_buffer(mm)
 
             incidents = data.get('incidents', [])
             logger.info(f"Cargados {len(incidents)} incidentes desde archivo")
@@ -72,35 +494,81 @@ class StorageManager:
             logger.error(f"Error cargando incidentes: {e}")
             return []
 
+    def _stream_snapshot(self, source: Path) -> Iterator[Dict[str, Any]]:
+        """Parsear el snapshot de a un incidente con ijson, con memoria constante"""
+        count = 0
+        try:
+            opener = gzip.open if _is_compressed(source) else open
+            with opener(source, 'rb') as f:
+                for record in ijson.items(f, 'incidents.item'):
+                    count += 1
+                    yield record
+            logger.info(f"Cargados {count} incidentes desde archivo")
+        except ijson.JSONError as e:
+            logger.error(f"Error decodificando JSON: {e}")
+        except Exception as e:
+            logger.error(f"Error cargando incidentes: {e}")
+
+    def _backup_due(self) -> bool:
+        """Verificar si corresponde un backup según el intervalo configurado"""
+        if self.backup_interval is None:
+            return False
+        now = time.monotonic()
+        if self._last_backup is not None and now - self._last_backup < self.backup_interval:
+            return False
+        self._last_backup = now
+        return True
+
     def _create_backup(self):
         """Crear backup del archivo actual"""
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = self.backup_dir / f"incidents_backup_{timestamp}.json"
+            source = self.snapshot_source
+            backup_file = self.backup_dir / f"incidents_backup_{time.time_ns()}{''.join(source.suffixes)}"
 
-            import shutil
-            shutil.copy2(self.incidents_file, backup_file)
+            if zstandard is not None and not _is_compressed(source):
+                # El JSON comprime varias veces su tamaño con un costo de CPU mínimo
+                backup_file = backup_file.with_name(backup_file.name + '.zst')
+                compressor = zstandard.ZstdCompressor(level=3)
+                with open(source, 'rb') as src, open(backup_file, 'wb') as dst:
+                    compressor.copy_stream(src, dst)
+            else:
+                backup_file.unlink(missing_ok=True)
+                try:
+                    # Sin copiar datos: el backup comparte el inodo del archivo actual
+                    os.link(source, backup_file)
+                except OSError:
+                    # Sistemas de archivos sin soporte de hardlinks
+                    shutil.copy2(source, backup_file)
 
-            # Mantener solo los últimos 5 backups
-            self._cleanup_old_backups()
+            # Mantener solo los últimos BACKUP_KEEP: al llenarse el anillo se borra el más antiguo
+            evicted = self._backup_ring[0] if len(self._backup_ring) == self._backup_ring.maxlen else None
+            self._backup_ring.append(backup_file)
+            if evicted is not None:
+                evicted.unlink(missing_ok=True)
 
             logger.info(f"Backup creado: {backup_file}")
 
         except Exception as e:
             logger.warning(f"Error creando backup: {e}")
 
-    def _cleanup_old_backups(self, keep_count: int = 5):
-        """Limpiar backups antiguos"""
+    def _cleanup_old_backups(self, keep_count: int = BACKUP_KEEP) -> List[Path]:
+        """Limpiar backups antiguos y devolver los conservados, del más antiguo al más nuevo"""
         try:
-            backup_files = sorted(
-                [f for f in self.backup_dir.glob("incidents_backup_*.json")],
-                key=lambda x: x.stat().st_mtime,
-                reverse=True
-            )
+            # Una sola lectura del directorio, sin stat por archivo
+            with os.scandir(self.backup_dir) as it:
+                backup_files = [entry for entry in it
+                                if entry.name.startswith("incidents_backup_")
+                                and entry.name.endswith(_BACKUP_SUFFIXES)]
+            backup_files.sort(key=lambda entry: _backup_key(entry.name), reverse=True)
+
+            doomed = backup_files[keep_count:]
+            if doomed:
+                for old_backup in doomed:
+                    os.unlink(old_backup.path)
+                logger.info(f"Eliminados {len(doomed)} backups antiguos")
 
-            for old_backup in backup_files[keep_count:]:
-                old_backup.unlink()
-                logger.info(f"Backup antiguo eliminado: {old_backup}")
+            return [Path(entry.path) for entry in reversed(backup_files[:keep_count])]
 
         except Exception as e:
-            logger.warning(f"Error limpiando backups: {e}")
\ No newline at end of file
+            logger.warning(f"Error limpiando backups: {e}")
+            return []
\ No newline at end of file
@@ -2,23 +2,44 @@
 Reglas por defecto del sistema
 """
 
-from typing import Dict, Set, List
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Mapping, Set, Tuple
 from incident.models import Operator
 
-def get_default_rules() -> Dict[str, Set[str]]:
+# Constantes inmutables construidas una sola vez al importar el módulo
+_DEFAULT_RULES: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    "infrastructure": frozenset({"admin", "network_engineer", "system_admin"}),
+    "security": frozenset({"security_analyst", "admin", "incident_responder"}),
+    "application": frozenset({"developer", "app_support", "admin"})
+})
+
+def invert_rules(rules: Mapping[str, FrozenSet[str]]) -> Dict[str, FrozenSet[str]]:
+    """Invertir reglas: rol -> tipos de incidente que puede atender"""
+    role_to_types: Dict[str, Set[str]] = defaultdict(set)
+    for incident_type, roles in rules.items():
+        for role in roles:
+            role_to_types[role].add(incident_type)
+    return {role: frozenset(types) for role, types in role_to_types.items()}
+
+_ROLE_INDEX: Mapping[str, FrozenSet[str]] = MappingProxyType(invert_rules(_DEFAULT_RULES))
+
+_DEFAULT_OPERATORS: Tuple[Operator, ...] = (
+    Operator(name="carlos", roles=frozenset({"admin", "system_admin"}), available=True),
+    Operator(name="ana", roles=frozenset({"security_analyst", "incident_responder"}), available=True),
+    Operator(name="miguel", roles=frozenset({"developer", "app_support"}), available=True),
+    Operator(name="sofia", roles=frozenset({"network_engineer", "system_admin"}), available=True),
+    Operator(name="admin", roles=frozenset({"admin", "security_analyst", "developer", "network_engineer"}), available=True),
+)
+
+def get_default_rules() -> Mapping[str, FrozenSet[str]]:
     """Obtener reglas por defecto: tipo de incidente -> roles permitidos"""
-    return {
-        "infrastructure": {"admin", "network_engineer", "system_admin"},
-        "security": {"security_analyst", "admin", "incident_responder"},
-        "application": {"developer", "app_support", "admin"}
-    }
+    return _DEFAULT_RULES
+
+def get_role_index() -> Mapping[str, FrozenSet[str]]:
+    """Obtener índice por defecto: rol -> tipos de incidente"""
+    return _ROLE_INDEX
 
-def get_default_operators() -> List[Operator]:
+def get_default_operators() -> Tuple[Operator, ...]:
     """Obtener operadores por defecto"""
-    return [
-        Operator(name="carlos", roles=("admin", "system_admin"), available=True),
-        Operator(name="ana", roles=("security_analyst", "incident_responder"), available=True),
-        Operator(name="miguel", roles=("developer", "app_support"), available=True),
-        Operator(name="sofia", roles=("network_engineer", "system_admin"), available=True),
-        Operator(name="admin", roles=("admin", "security_analyst", "developer", "network_engineer"), available=True),
-    ]
\ No newline at end of file
+    return _DEFAULT_OPERATORS
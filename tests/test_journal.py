@@ -0,0 +1,117 @@
+"""
+Pruebas del journal de cambios
+"""
+
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from core.dispatcher import IncidentDispatcher
+from persistence import storage
+from persistence.storage import StorageManager
+
+
+class JournalRecoveryTest(unittest.TestCase):
+    """Un journal dañado no debe hacer perder cambios confirmados"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self._tmp.name
+        self.addCleanup(self._tmp.cleanup)
+
+    def _dispatcher(self):
+        manager = StorageManager(self.data_dir, backup_interval=None)
+        self.addCleanup(manager.close)
+        return IncidentDispatcher(manager)
+
+    def test_torn_tail_does_not_swallow_next_record(self):
+        dispatcher = self._dispatcher()
+        self.assertEqual(dispatcher.register_incident('security', 'high', 'primer incidente'), 1)
+
+        # Simular una caída a mitad de una escritura
+        with open(dispatcher.storage.journal_file, 'ab') as f:
+            f.write(b'{"id":2,"type":"secu')
+
+        dispatcher = self._dispatcher()
+        self.assertEqual(dispatcher.next_id, 2)
+        self.assertEqual(dispatcher.register_incident('application', 'low', 'segundo incidente'), 2)
+
+        self.assertEqual(sorted(self._dispatcher().incidents), [1, 2])
+
+    def test_damaged_line_skips_only_itself(self):
+        manager = StorageManager(self.data_dir, backup_interval=None)
+        self.addCleanup(manager.close)
+        manager.append_incident({'id': 1, 'value': 'a'})
+        with open(manager.journal_file, 'ab') as f:
+            f.write(b'\xff\xfe no es utf-8\n')
+            f.write(b'{"sin_id": true}\n')
+            f.write(b'[1, 2]\n')
+        manager.append_incident({'id': 2, 'value': 'b'})
+
+        reader = StorageManager(self.data_dir, backup_interval=None)
+        self.addCleanup(reader.close)
+        self.assertEqual([r['id'] for r in reader.load_incidents()], [1, 2])
+
+
+class JournalCompactionTest(unittest.TestCase):
+    """Compactar mientras siguen llegando cambios no debe perder ninguno"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self._tmp.name
+        self.addCleanup(self._tmp.cleanup)
+
+    def _manager(self):
+        manager = StorageManager(self.data_dir, backup_interval=None)
+        self.addCleanup(manager.close)
+        return manager
+
+    def _state(self):
+        return {r['id']: r['value'] for r in self._manager().iter_incidents()}
+
+    def test_replays_compacting_file_and_new_journal(self):
+        manager = self._manager()
+        manager.save_incidents([{'id': 1, 'value': 'snapshot'}])
+        manager.append_events([{'id': 1, 'value': 'rotado'}, {'id': 2, 'value': 'rotado'}])
+
+        # Compactación interrumpida tras rotar: los cambios nuevos van a un journal vacío
+        manager._rotate_journal()
+        self.assertTrue(manager.compacting_file.exists())
+        manager.append_events([{'id': 2, 'value': 'nuevo'}, {'id': 3, 'value': 'nuevo'}])
+
+        expected = {1: 'rotado', 2: 'nuevo', 3: 'nuevo'}
+        self.assertEqual(self._state(), expected)
+
+        # La siguiente compactación une ambos archivos en el snapshot
+        manager.compact()
+        self.assertFalse(manager.compacting_file.exists())
+        self.assertFalse(manager.journal_file.exists())
+        self.assertEqual(self._state(), expected)
+
+    def test_appends_during_background_compaction(self):
+        expected = {}
+        with mock.patch.object(storage, 'JOURNAL_COMPACTION_MIN_BYTES', 2048):
+            manager = self._manager()
+            writers = []
+            for start in range(4):
+                # Cada hilo escribe sus propios ids; varias versiones por id
+                batch = [{'id': start + 4 * (n % 25), 'value': n} for n in range(200)]
+                expected.update((event['id'], event['value']) for event in batch)
+                writers.append(threading.Thread(
+                    target=lambda events=batch: [manager.append_incident(e) for e in events]))
+            for writer in writers:
+                writer.start()
+            for writer in writers:
+                writer.join()
+            manager.close()
+
+        self.assertFalse(manager._writer.is_alive())
+        self.assertTrue(manager.incidents_file.exists())  # Hubo compactación en segundo plano
+        self.assertEqual(self._state(), expected)
+        manager.compact()
+        self.assertEqual(self._state(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Pruebas de persistencia al cambiar el formato del snapshot
+"""
+
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from core.dispatcher import IncidentDispatcher
+from persistence import storage
+from persistence.storage import StorageManager
+
+
+class SnapshotFormatSwitchTest(unittest.TestCase):
+    """Cambiar de formato no debe ocultar incidentes ni reutilizar sus ids"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self._tmp.name
+        self.addCleanup(self._tmp.cleanup)
+
+    def _seed(self, **options):
+        """Crear un snapshot con dos incidentes en el formato indicado"""
+        manager = StorageManager(self.data_dir, backup_interval=None, **options)
+        self.addCleanup(manager.close)
+        manager.save_incidents([
+            {'id': i, 'type': 'security', 'priority': 'high', 'description': f'incidente {i}',
+             'created_at': datetime(2024, 1, 1).isoformat(), 'assigned_to': None, 'status': 'pending'}
+            for i in (1, 2)
+        ])
+
+    def _dispatcher(self, **options):
+        manager = StorageManager(self.data_dir, backup_interval=None, **options)
+        self.addCleanup(manager.close)
+        return IncidentDispatcher(manager)
+
+    def _assert_switch(self, old: dict, new: dict):
+        self._seed(**old)
+
+        # Registrar con el formato nuevo sin compactar (solo queda en el journal)
+        dispatcher = self._dispatcher(**new)
+        self.assertEqual(sorted(dispatcher.incidents), [1, 2])
+        self.assertEqual(dispatcher.register_incident('application', 'low', 'incidente nuevo'), 3)
+
+        # Volver al formato anterior: el journal se aplica sobre los mismos datos
+        dispatcher = self._dispatcher(**old)
+        self.assertEqual(dispatcher.incidents[1].description, 'incidente 1')
+        self.assertEqual(sorted(dispatcher.incidents), [1, 2, 3])
+
+        # Compactar con el formato nuevo migra el snapshot y elimina el anterior
+        dispatcher = self._dispatcher(**new)
+        dispatcher.shutdown()
+        names = sorted(p.name for p in Path(self.data_dir).glob('incidents.*'))
+        self.assertEqual(names, [dispatcher.storage.incidents_file.name])
+        self.assertEqual(sorted(self._dispatcher(**new).incidents), [1, 2, 3])
+
+    def test_json_to_gzip(self):
+        self._assert_switch({'compressed': False}, {'compressed': True})
+
+    def test_gzip_to_json(self):
+        self._assert_switch({'compressed': True}, {'compressed': False})
+
+    @unittest.skipIf(storage.msgpack is None, "msgpack no está instalado")
+    def test_json_to_msgpack(self):
+        self._assert_switch({'binary': False}, {'binary': True})
+
+
+if __name__ == '__main__':
+    unittest.main()